@@ -1,33 +1,30 @@
-import pyttsx3
 import os
-from typing import Optional
+import re
+import wave
+from typing import Any, Callable, List, Dict, Iterator, Optional
 import streamlit as st
 import time
+from model_registry import registry, SPEECH_RATE
+from pipeline import stage_metrics
 
 class AudioProcessor:
     def __init__(self):
         try:
-            # Initialize text-to-speech engine with error handling
-            self.tts_engine = pyttsx3.init()
-            # Configure TTS settings
-            self.tts_engine.setProperty('rate', 150)    # Speed of speech
-            self.tts_engine.setProperty('volume', 0.9)  # Volume (0.0 to 1.0)
-            
-            # Get available voices and set a good quality one
-            voices = self.tts_engine.getProperty('voices')
-            if voices:
-                # Try to find a female voice
-                female_voice = next((voice for voice in voices if "female" in voice.name.lower()), None)
-                if female_voice:
-                    self.tts_engine.setProperty('voice', female_voice.id)
-                else:
-                    self.tts_engine.setProperty('voice', voices[0].id)
+            # The engine is created and configured once per process by the registry
+            self.tts_engine = registry.get("tts")
+            # The engine is shared between sessions and threads, so serialize its use
+            self.tts_lock = registry.lock("tts")
         except Exception as e:
             st.error(f"Error initializing TTS engine: {str(e)}")
             raise
     
-    def save_audio(self, text: str, output_path: str) -> bool:
-        """Save text as audio file with improved quality and error handling"""
+    def save_audio(self, text: str, output_path: str, report: Optional[Callable[[str], Any]] = None) -> bool:
+        """Save text as audio file with improved quality and error handling.
+
+        Errors are shown with st.error unless ``report`` is given, e.g. to collect
+        them on a worker thread that must not write to the page.
+        """
+        report = report or st.error
         max_retries = 3
         for attempt in range(max_retries):
             try:
@@ -36,8 +33,15 @@ class AudioProcessor:
                 
                 # Save to a temporary file first
                 temp_path = f"{output_path}.temp"
-                self.tts_engine.save_to_file(processed_text, temp_path)
-                self.tts_engine.runAndWait()
+                requested_at = time.monotonic()
+                with self.tts_lock:
+                    acquired_at = time.monotonic()
+                    try:
+                        self.tts_engine.save_to_file(processed_text, temp_path)
+                        self.tts_engine.runAndWait()
+                    finally:
+                        # Waiting for the shared engine is queueing, reported apart from synthesis
+                        stage_metrics.record("tts", time.monotonic() - acquired_at, acquired_at - requested_at)
                 
                 # Verify the file was created and has content
                 if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
@@ -54,7 +58,7 @@ class AudioProcessor:
                 return False
                 
             except Exception as e:
-                st.error(f"Error creating audio (attempt {attempt + 1}/{max_retries}): {str(e)}")
+                report(f"Error creating audio (attempt {attempt + 1}/{max_retries}): {str(e)}")
                 if attempt < max_retries - 1:
                     time.sleep(1)  # Wait before retry
                     continue
@@ -65,4 +69,36 @@ class AudioProcessor:
                     try:
                         os.remove(temp_path)
                     except:
-                        pass 
+                        pass
+
+    def split_sentences(self, text: str) -> List[str]:
+        """Split text into sentences for segment-by-segment synthesis"""
+        return [sent.strip() for sent in re.split(r'(?<=[.!?])\s+', text) if sent.strip()]
+
+    def get_audio_duration(self, audio_path: str, text: str) -> float:
+        """Read the duration of a synthesized file, estimating it if the header is unreadable"""
+        try:
+            with wave.open(audio_path, 'rb') as audio_file:
+                frames = audio_file.getnframes()
+                rate = audio_file.getframerate()
+                if rate > 0 and frames > 0:
+                    return frames / float(rate)
+        except (wave.Error, EOFError, OSError):
+            pass
+        # Not a readable WAV (e.g. real mp3 output), fall back to the speech rate
+        return max(len(text.split()), 1) * 60.0 / SPEECH_RATE
+
+    def synthesize_segments(self, text: str, output_prefix: str,
+                            report: Optional[Callable[[str], Any]] = None) -> Iterator[Dict]:
+        """Synthesize text sentence by sentence, yielding each segment as soon as it is ready"""
+        for index, sentence in enumerate(self.split_sentences(text)):
+            segment_path = f"{output_prefix}_part{index:03d}.mp3"
+            if not self.save_audio(sentence, segment_path, report):
+                (report or st.warning)(f"Skipping sentence {index + 1}: audio could not be generated")
+                continue
+            yield {
+                "index": index,
+                "path": segment_path,
+                "text": sentence,
+                "duration": self.get_audio_duration(segment_path, sentence),
+            }
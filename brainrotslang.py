@@ -1,13 +1,8 @@
-import spacy
 from random import choice
+from model_registry import registry
 
-# Load a small English NLP model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    import subprocess
-    subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
-    nlp = spacy.load("en_core_web_sm")
+# Shared small English NLP model (downloaded by the registry if missing)
+nlp = registry.get("spacy")
 
 # Dictionary of slang words and their conversational meanings
 slang_dict = {
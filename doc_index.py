@@ -0,0 +1,173 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from spacy.tokens import Doc, DocBin
+
+INDEX_DIR = Path(__file__).parent / "data" / "doc_index"
+
+# Parsed documents kept in memory in addition to the files on disk
+MEMORY_SIZE = 256
+
+# Entries not read or written for this long are removed from disk
+INDEX_TTL = 7 * 24 * 3600
+
+# Above this total size the least recently used entries are removed first
+INDEX_MAX_BYTES = 200 * 1024 * 1024
+
+# Minimum seconds between two scans of the index directory in one process
+PRUNE_INTERVAL = 600
+
+# Leftover temporary files from interrupted writes older than this are removed
+TEMP_TTL = 3600
+
+
+class DocIndex:
+    """Store of processed spaCy Docs keyed by a hash of the page text.
+
+    Tokens, sentences and entities do not change when only the summary length
+    or scoring weights change, so the summarizer re-scores a stored Doc instead
+    of running the pipeline again. Docs are kept in a small in-memory LRU and
+    persisted as DocBin files, so they survive reruns and restarts. Persisting
+    is best effort: if the disk cannot be written, Docs are only kept in memory.
+    Reading an
+    entry refreshes its modification time, and ``prune()`` evicts files by age
+    and, past the size cap, least recently used first.
+    """
+
+    def __init__(self, directory: Path = INDEX_DIR, memory_size: int = MEMORY_SIZE,
+                 ttl: float = INDEX_TTL, max_bytes: int = INDEX_MAX_BYTES):
+        # Created on the first write, so an unwritable data directory does not break imports
+        self.directory = Path(directory)
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, Doc]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def key(self, nlp, text: str) -> str:
+        """Hash of the text, scoped to the model so upgrading it invalidates old entries"""
+        model = f"{nlp.meta.get('name', '')}-{nlp.meta.get('version', '')}"
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.spacy"
+
+    def _remember(self, key: str, doc: Doc):
+        with self._lock:
+            self._memory[key] = doc
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def get(self, nlp, text: str) -> Optional[Doc]:
+        """Return the stored Doc for this text, or None if it was never processed"""
+        key = self.key(nlp, text)
+        with self._lock:
+            doc = self._memory.get(key)
+            if doc is not None:
+                self._memory.move_to_end(key)
+                return doc
+
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            doc_bin = DocBin().from_bytes(path.read_bytes())
+            doc = next(iter(doc_bin.get_docs(nlp.vocab)))
+        except Exception:
+            # Corrupt or incompatible entry, parse the text again
+            return None
+        try:
+            # The modification time doubles as the last use for pruning
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, doc)
+        return doc
+
+    def put(self, nlp, text: str, doc: Doc) -> bool:
+        """Store a processed Doc in memory and on disk, returning whether it reached the disk"""
+        key = self.key(nlp, text)
+        self._remember(key, doc)
+        doc_bin = DocBin(store_user_data=False)
+        doc_bin.add(doc)
+        data = doc_bin.to_bytes()
+        temp_path = None
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+            return True
+        except OSError:
+            # Disk full or read-only data directory: keep serving the Doc from memory
+            if temp_path is not None:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return False
+
+    def prune(self, force: bool = False) -> int:
+        """Remove expired entries, then the least recently used ones until the index fits the size cap.
+
+        Scans at most once per PRUNE_INTERVAL unless forced. Returns the number of files removed.
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_prune < PRUNE_INTERVAL:
+                return 0
+            self._last_prune = now
+
+        if not self.directory.is_dir():
+            return 0
+        removed = 0
+        entries = []
+        for path in self.directory.iterdir():
+            try:
+                stat = path.stat()
+                if path.suffix == ".tmp":
+                    if now - stat.st_mtime > TEMP_TTL:
+                        path.unlink()
+                        removed += 1
+                elif path.suffix == ".spacy":
+                    if now - stat.st_mtime > self.ttl:
+                        path.unlink()
+                        removed += 1
+                    else:
+                        entries.append((stat.st_mtime, stat.st_size, path))
+            except FileNotFoundError:
+                # Removed concurrently by another session or process
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def get_or_parse(self, nlp, text: str) -> Doc:
+        """Return the stored Doc for this text, running the pipeline only the first time"""
+        doc = self.get(nlp, text)
+        if doc is None:
+            doc = nlp(text)
+            self.put(nlp, text, doc)
+        return doc
+
+
+doc_index = DocIndex()
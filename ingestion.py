@@ -0,0 +1,73 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+# Bytes written (and hashed) per step while spooling an upload
+CHUNK_SIZE = 1024 * 1024
+
+
+class IngestedUpload:
+    """An uploaded file spooled to disk together with its content hash"""
+
+    def __init__(self, path: str, sha256: str, size: int):
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+    def touch(self):
+        """Refresh the file's modification time so age-based cleanup treats it as in use"""
+        os.utime(self.path)
+
+    @contextmanager
+    def open_view(self) -> Iterator[mmap.mmap]:
+        """Memory-map the spooled file read-only; pages are loaded by the OS on demand"""
+        with open(self.path, "rb") as f:
+            view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield view
+            finally:
+                view.close()
+
+    def remove(self):
+        """Delete the spooled file"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def _iter_chunks(upload: IO[bytes], chunk_size: int) -> Iterator[bytes]:
+    """Yield the upload's content chunk by chunk without copying it as a whole"""
+    getbuffer = getattr(upload, "getbuffer", None)
+    if getbuffer is not None:
+        # Streamlit's UploadedFile is a BytesIO: slices of its buffer are zero-copy views
+        with getbuffer() as buffer:
+            for start in range(0, len(buffer), chunk_size):
+                yield buffer[start:start + chunk_size]
+        return
+
+    upload.seek(0)
+    while True:
+        chunk = upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def spool_upload(upload: IO[bytes], directory: str, prefix: str = "uploaded_",
+                 suffix: str = ".pdf", chunk_size: int = CHUNK_SIZE) -> IngestedUpload:
+    """Write an upload to a uniquely named file in chunks, hashing it on the way"""
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=directory)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in _iter_chunks(upload, chunk_size):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception:
+        os.unlink(path)
+        raise
+    return IngestedUpload(path, digest.hexdigest(), size)
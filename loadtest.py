@@ -0,0 +1,557 @@
+"""Offline load test: drive concurrent simulated sessions through one Streamlit server.
+
+The server is started the way `streamlit run main.py` starts it on a dyno, in
+a process of its own with the stand-ins installed: pyttsx3 runs on a fake
+driver with configurable latency and YouTube is stubbed, so nothing leaves the
+machine; spaCy, pdfplumber and the app code are the real ones. Every session
+is a headless websocket client that uploads a generated PDF, renders the first
+results page and asks for its audio, the way a user clicking through the app
+would. Sessions are threads of that one server process, sharing its models,
+its GIL and the TTS engine lock, so the numbers show the capacity of a single
+server process.
+
+    python loadtest.py --concurrency 1,2,4,8 --mix 2:5,10:3,40:2
+"""
+import argparse
+import asyncio
+import io
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.request
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import psutil
+import streamlit as st
+import websockets
+from pyttsx3.voice import Voice
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from streamlit.web import bootstrap
+
+import video_processor
+from model_registry import registry, create_tts_engine, warm_up_tts, SPEECH_RATE
+from pipeline import stage_metrics
+
+APP_PATH = Path(__file__).parent / "main.py"
+DATA_DIR = Path(__file__).parent / "data"
+
+# Name under which the fake driver is registered with pyttsx3
+FAKE_DRIVER = "loadtest_fake"
+# Query parameter naming the PDF the fake uploader returns to a session
+UPLOAD_PARAM = "loadtest_pdf"
+# Sample rate of the silent WAV files written by the fake driver
+SAMPLE_RATE = 8000
+
+ENTITIES = ["Apple", "Paris", "Microsoft", "Berlin", "NASA", "Tokyo", "the United Nations", "Germany"]
+WORDS = ("market growth report quarter revenue policy research team project customer data "
+         "system analysis strategy results budget forecast review partner product").split()
+
+
+class FakeTTSDriver:
+    """pyttsx3 driver that sleeps instead of speaking and writes silent WAV files"""
+
+    def __init__(self, proxy, latency: float, latency_per_word: float):
+        self._proxy = proxy
+        self._looping = False
+        self._end_pending = False
+        self.latency = latency
+        self.latency_per_word = latency_per_word
+        voices = [Voice("loadtest.female", "Load Test Female", ["en-US"], "female", "adult")]
+        self._config = {"rate": SPEECH_RATE, "volume": 1.0, "voice": voices[0].id, "voices": voices}
+
+    def _synthesize(self, text: str) -> float:
+        """Simulate synthesis latency and return the spoken duration of the text"""
+        time.sleep(self.latency + self.latency_per_word * len(text.split()))
+        return max(len(text.split()), 1) * 60.0 / self._config["rate"]
+
+    def destroy(self):
+        pass
+
+    def startLoop(self):
+        if self._end_pending:
+            self._end_pending = False
+            return
+        first = True
+        self._looping = True
+        while self._looping:
+            if first:
+                # Runs every queued command, including the endLoop pushed by runAndWait
+                self._proxy.setBusy(False)
+                first = False
+            else:
+                time.sleep(0.001)
+
+    def endLoop(self):
+        if self._looping:
+            self._looping = False
+        else:
+            # Commands run eagerly once the proxy is idle, so endLoop can arrive before startLoop
+            self._end_pending = True
+
+    def iterate(self):
+        self._proxy.setBusy(False)
+        yield
+
+    def say(self, text):
+        self._proxy.setBusy(True)
+        self._proxy.notify("started-utterance")
+        self._synthesize(text)
+        self._proxy.notify("finished-utterance", completed=True)
+        self._proxy.setBusy(False)
+
+    def save_to_file(self, text, filename):
+        self._proxy.setBusy(True)
+        self._proxy.notify("started-utterance")
+        duration = self._synthesize(text)
+        with wave.open(filename, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(SAMPLE_RATE)
+            out.writeframes(b"\0\0" * int(duration * SAMPLE_RATE))
+        self._proxy.notify("finished-utterance", completed=True)
+        self._proxy.setBusy(False)
+
+    def stop(self):
+        pass
+
+    def getProperty(self, name):
+        try:
+            return self._config[name]
+        except KeyError:
+            raise KeyError(f"unknown property {name}")
+
+    def setProperty(self, name, value):
+        if name not in self._config:
+            raise KeyError(f"unknown property {name}")
+        self._config[name] = value
+
+
+class StubYouTube:
+    """Offline stand-in for pytube.YouTube; the player only needs the video id"""
+
+    def __init__(self, url: str):
+        self.video_url = url
+        self.video_id = url.rsplit("=", 1)[-1]
+
+
+class FakeUpload(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile, which is a BytesIO with metadata"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+        self.size = os.path.getsize(path)
+        self.type = "application/pdf"
+        self.file_id = path
+
+
+def _fake_file_uploader(label, *args, **kwargs):
+    """Return the PDF the current simulated session passed in its query string"""
+    path = st.query_params.get(UPLOAD_PARAM)
+    return FakeUpload(path) if path else None
+
+
+def install_stand_ins(tts_latency: float, tts_latency_per_word: float):
+    """Swap in the fake speech driver, the YouTube stub and the fake uploader"""
+    module = types.ModuleType(f"pyttsx3.drivers.{FAKE_DRIVER}")
+    module.buildDriver = lambda proxy: FakeTTSDriver(proxy, tts_latency, tts_latency_per_word)
+    sys.modules[module.__name__] = module
+    registry.register("tts", lambda: create_tts_engine(FAKE_DRIVER), warm_up=warm_up_tts)
+
+    video_processor.YouTube = StubYouTube
+    st.file_uploader = _fake_file_uploader
+
+
+def _pdf_string(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[List[Tuple[int, str]]], path: str):
+    """Write a minimal PDF; each page is a list of (y position, text line)"""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    # Each page adds a content stream and a page object; the page tree comes right after
+    pages_id = len(objects) + 2 * len(pages) + 1
+    page_ids = []
+    for lines in pages:
+        ops = "\n".join(f"BT /F1 11 Tf 72 {y} Td ({_pdf_string(text)}) Tj ET" for y, text in lines)
+        stream = ops.encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font, content)
+        ))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.sample(WORDS, rng.randint(5, 12))
+    words.insert(rng.randrange(len(words)), rng.choice(ENTITIES))
+    sentence = " ".join(words)
+    return sentence[0].upper() + sentence[1:] + "."
+
+
+def make_document(path: str, page_count: int, seed: int):
+    """Generate a report-like PDF with a running header and footer on every page"""
+    rng = random.Random(seed)
+    pages = []
+    for page_num in range(1, page_count + 1):
+        lines = [(760, "Company Confidential - Quarterly Report")]
+        # Unique first line so documents never share cached annotations
+        lines.append((700, f"Document {seed} section {page_num} covers {rng.choice(ENTITIES)}."))
+        lines += [(680 - 16 * i, _sentence(rng)) for i in range(30)]
+        lines.append((40, f"Page {page_num} of {page_count}"))
+        pages.append(lines)
+    build_pdf(pages, path)
+
+
+def parse_mix(mix: str) -> List[Tuple[int, float]]:
+    """Parse "pages:weight,..." into (page count, weight) pairs"""
+    sizes = []
+    for part in mix.split(","):
+        pages, _, weight = part.partition(":")
+        sizes.append((int(pages), float(weight or 1)))
+    return sizes
+
+
+def _serve(port: int, tts_latency: float, tts_latency_per_word: float, control):
+    """Run main.py under a Streamlit server in this process, answering metric requests on `control`"""
+    install_stand_ins(tts_latency, tts_latency_per_word)
+
+    def answer():
+        try:
+            while True:
+                command = control.recv()
+                if command == "reset":
+                    stage_metrics.reset()
+                    control.send(None)
+                elif command == "snapshot":
+                    control.send(stage_metrics.snapshot())
+        except EOFError:
+            return
+
+    threading.Thread(target=answer, name="loadtest-control", daemon=True).start()
+    flag_options = {
+        "server.port": port,
+        "server.headless": True,
+        "server.fileWatcherType": "none",
+        "server.runOnSave": False,
+        "browser.gatherUsageStats": False,
+    }
+    bootstrap.load_config_options(flag_options)
+    bootstrap.run(str(APP_PATH), False, [], flag_options)
+
+
+class AppServer:
+    """A Streamlit server for main.py running in a child process"""
+
+    def __init__(self, tts_latency: float, tts_latency_per_word: float):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        # A fresh interpreter, like `streamlit run`, rather than a fork of the harness
+        context = multiprocessing.get_context("spawn")
+        self._control, child_control = context.Pipe()
+        self.process = context.Process(
+            target=_serve, args=(self.port, tts_latency, tts_latency_per_word, child_control),
+            name="loadtest-server", daemon=True,
+        )
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def start(self, timeout: float = 60):
+        self.process.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1):
+                    return
+            except OSError:
+                if not self.process.is_alive() or time.monotonic() > deadline:
+                    raise RuntimeError("The Streamlit server did not start")
+                time.sleep(0.2)
+
+    def reset_metrics(self):
+        self._control.send("reset")
+        self._control.recv()
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        self._control.send("snapshot")
+        return self._control.recv()
+
+    def stop(self):
+        # SIGTERM runs Streamlit's own shutdown, as on a dyno restart
+        self.process.terminate()
+        self.process.join(10)
+        if self.process.is_alive():
+            self.process.kill()
+
+
+def _client_state(query_string: str, widgets: List[WidgetState]) -> BackMsg:
+    message = BackMsg()
+    message.rerun_script.query_string = query_string
+    message.rerun_script.widget_states.widgets.extend(widgets)
+    return message
+
+
+async def _run_script(connection, query_string: str, widgets: List[WidgetState], timeout: float) -> List:
+    """Ask the server for a script run and return the elements it rendered"""
+    try:
+        return await asyncio.wait_for(_collect_run(connection, query_string, widgets), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"The script run did not finish within {timeout:g}s") from None
+
+
+async def _collect_run(connection, query_string: str, widgets: List[WidgetState]) -> List:
+    await connection.send(_client_state(query_string, widgets).SerializeToString())
+    elements = []
+    while True:
+        message = ForwardMsg()
+        message.ParseFromString(await connection.recv())
+        kind = message.WhichOneof("type")
+        if kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+            elements.append(message.delta.new_element)
+        elif kind == "script_finished":
+            if message.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                elements = []
+                continue
+            if message.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                raise RuntimeError("main.py failed to compile")
+            return elements
+
+
+def _app_error(elements: List) -> Optional[str]:
+    """Message of the first exception the script raised, if any"""
+    for element in elements:
+        if element.WhichOneof("type") == "exception":
+            return element.exception.message
+    return None
+
+
+async def run_session(url: str, pdf_path: str, request_audio: bool, timeout: float) -> Tuple[float, Optional[str]]:
+    """Run one simulated user through the app and return its latency and the app's error, if any.
+
+    Exceptions raised here mean the session produced no result (connection, protocol or timeout).
+    """
+    started = time.monotonic()
+    query_string = urlencode({UPLOAD_PARAM: pdf_path})
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as connection:
+        elements = await _run_script(connection, query_string, [], timeout)
+        error = _app_error(elements)
+        if error is None and request_audio:
+            button = next((element.button for element in elements if element.WhichOneof("type") == "button"
+                           and "audio_view_" in element.button.id), None)
+            if button is None:
+                error = "No 'Generate audio' button was rendered"
+            else:
+                click = WidgetState(id=button.id, trigger_value=True)
+                elements = await _run_script(connection, query_string, [click], timeout)
+                error = _app_error(elements)
+    return time.monotonic() - started, error
+
+
+class ResourceSampler(threading.Thread):
+    """Track peak RSS and CPU time of the server process while a level runs"""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak_rss = self.process.memory_info().rss
+        self._cpu_start = self.process.cpu_times()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+    def stop(self) -> float:
+        """Stop sampling and return the CPU seconds used since the start"""
+        self._stopped.set()
+        self.join()
+        cpu = self.process.cpu_times()
+        return (cpu.user - self._cpu_start.user) + (cpu.system - self._cpu_start.system)
+
+
+async def _run_sessions(url: str, concurrency: int, documents: List[str], request_audio: bool,
+                        timeout: float) -> List:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited(path: str):
+        async with slots:
+            return await run_session(url, path, request_audio, timeout)
+
+    return await asyncio.gather(*(limited(path) for path in documents), return_exceptions=True)
+
+
+def run_level(server: AppServer, concurrency: int, documents: List[str], request_audio: bool,
+              timeout: float) -> Dict:
+    """Run every document as its own session against the server, at most `concurrency` at a time"""
+    server.reset_metrics()
+    sampler = ResourceSampler(server.process.pid)
+    sampler.start()
+    started = time.monotonic()
+
+    latencies, app_failures, harness_errors = [], [], []
+    for outcome in asyncio.run(_run_sessions(server.url, concurrency, documents, request_audio, timeout)):
+        if isinstance(outcome, BaseException):
+            harness_errors.append(f"{type(outcome).__name__}: {outcome}")
+            continue
+        latency, error = outcome
+        if error:
+            app_failures.append(error)
+        else:
+            latencies.append(latency)
+
+    wall = time.monotonic() - started
+    cpu_seconds = sampler.stop()
+    return {
+        "concurrency": concurrency,
+        "sessions": len(documents),
+        "latencies": latencies,
+        "app_failures": app_failures,
+        "harness_errors": harness_errors,
+        "wall": wall,
+        "cpu_cores": cpu_seconds / wall if wall else 0.0,
+        "peak_rss": sampler.peak_rss,
+        "stages": server.metrics(),
+    }
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def print_report(level: Dict):
+    latencies = level["latencies"]
+    wall = level["wall"]
+    print(
+        f"concurrency={level['concurrency']:<3} sessions={level['sessions']:<3} "
+        f"completed={len(latencies):<3} app_failed={len(level['app_failures']):<3} "
+        f"harness_errors={len(level['harness_errors']):<3} wall={wall:6.1f}s "
+        f"throughput={len(latencies) / wall * 60 if wall else 0:6.1f}/min "
+        f"p50={statistics.median(latencies) if latencies else 0:5.1f}s "
+        f"p95={_percentile(latencies, 0.95):5.1f}s "
+        f"peak_rss={level['peak_rss'] / 2 ** 20:7.1f}MB cpu={level['cpu_cores']:4.2f} cores"
+    )
+    # Throughput and latency cover completed sessions only
+    if level["harness_errors"]:
+        print(f"    warning: {len(level['harness_errors'])} of {level['sessions']} sessions never "
+              f"produced a result, so this level is incomplete")
+    # Utilization = busy seconds / wall seconds, i.e. the average number of busy workers.
+    # The "tts" row is the shared engine: at most one synthesis at a time, so 1.00 means it
+    # is saturated, and its avg_queue is the wait for the engine lock. That wait is part
+    # of the audio stage's busy time.
+    for name, totals in level["stages"].items():
+        items = int(totals["items"])
+        print(
+            f"    {name:<10} items={items:<5} busy={totals['busy']:7.1f}s "
+            f"util={totals['busy'] / wall if wall else 0:5.2f} "
+            f"avg_queue={totals['waited'] / items * 1000 if items else 0:8.1f}ms"
+        )
+    for failure in level["app_failures"][:3]:
+        print(f"    app failure: {failure}")
+    for error in level["harness_errors"][:3]:
+        print(f"    harness error: {error}")
+
+
+def _data_files() -> set:
+    return {path for path in DATA_DIR.rglob("*") if path.is_file()} if DATA_DIR.exists() else set()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline multi-session load test for main.py")
+    parser.add_argument("--concurrency", default="1,2,4,8",
+                        help="comma-separated concurrent session counts to ramp through")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="sessions per level (default: twice the concurrency)")
+    parser.add_argument("--mix", default="2:5,10:3,40:2",
+                        help="PDF size mix as pages:weight pairs")
+    parser.add_argument("--tts-latency", type=float, default=0.2,
+                        help="fake TTS seconds per utterance")
+    parser.add_argument("--tts-latency-per-word", type=float, default=0.02,
+                        help="extra fake TTS seconds per word")
+    parser.add_argument("--no-audio", action="store_true",
+                        help="only extract and summarize, never request audio")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per app run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    sizes = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+
+    existing_files = _data_files()
+    pdf_dir = tempfile.mkdtemp(prefix="loadtest_")
+    server = AppServer(args.tts_latency, args.tts_latency_per_word)
+    try:
+        started = time.monotonic()
+        server.start()
+        # One unmeasured session loads and warms up the models, like the first visitor after a deploy
+        warm_up_path = os.path.join(pdf_dir, "warm_up.pdf")
+        make_document(warm_up_path, 2, seed=rng.randrange(10 ** 9))
+        _, error = asyncio.run(run_session(server.url, warm_up_path, not args.no_audio, args.timeout))
+        if error:
+            raise RuntimeError(f"Warm-up session failed: {error}")
+        print(f"server started and warmed up in {time.monotonic() - started:.1f}s")
+
+        for concurrency in levels:
+            documents = []
+            for _ in range(args.sessions or 2 * concurrency):
+                page_count = rng.choices([pages for pages, _ in sizes], [weight for _, weight in sizes])[0]
+                path = os.path.join(pdf_dir, f"doc_{len(os.listdir(pdf_dir))}_{page_count}p.pdf")
+                make_document(path, page_count, seed=rng.randrange(10 ** 9))
+                documents.append(path)
+            print_report(run_level(server, concurrency, documents, not args.no_audio, args.timeout))
+    finally:
+        server.stop()
+        shutil.rmtree(pdf_dir, ignore_errors=True)
+        # Remove spooled uploads, audio and index entries created by the simulated sessions
+        for path in _data_files() - existing_files:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,18 @@ import streamlit as st
 import tempfile
 import os
 import time
+import uuid
 import subprocess
 import sys
 from pathlib import Path
 from pdf_extractor import PDFExtractor
-from text_summarizer import TextSummarizer
+from text_summarizer import TextSummarizer, TOP_K, ENTITY_WEIGHT, WORD_WEIGHT, LENGTH_BONUS
 from audio_processor import AudioProcessor
 from video_processor import VideoProcessor
+from pipeline import PipelineExecutor, Stage
+from model_registry import registry
+from ingestion import spool_upload
+from doc_index import doc_index
 
 # Must be the first Streamlit command
 st.set_page_config(page_title="PDF Processor with AI", page_icon="📚")
@@ -17,49 +22,187 @@ st.set_page_config(page_title="PDF Processor with AI", page_icon="📚")
 DATA_DIR = Path(__file__).parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
-@st.cache_resource
-def load_spacy_model():
-    """Load spaCy model with caching"""
-    try:
-        import spacy
-        return spacy.load("en_core_web_sm")
-    except OSError:
-        st.info("Downloading language model... This may take a moment.")
-        import spacy.cli
-        spacy.cli.download("en_core_web_sm")
-        return spacy.load("en_core_web_sm")
-    except Exception as e:
-        st.error(f"Error loading language model: {str(e)}")
-        return None
+# Pipeline settings: pages waiting between two stages, and worker threads per stage.
+# Extra "audio" workers do not help: the shared pyttsx3 engine is used under a lock.
+PIPELINE_QUEUE_SIZE = 4
+PIPELINE_WORKERS = {"extract": 1, "summarize": 1, "audio": 1}
+
+# Number of PDF pages shown per results page
+PAGES_PER_VIEW = 10
 
-@st.cache_data
 def get_temp_file_path(prefix, suffix):
-    """Generate a temporary file path in the data directory"""
+    """Generate a unique temporary file path in the data directory"""
     timestamp = int(time.time() * 1000)
-    return str(DATA_DIR / f"{prefix}_{timestamp}{suffix}")
+    return str(DATA_DIR / f"{prefix}_{timestamp}_{uuid.uuid4().hex[:8]}{suffix}")
+
+def release_uploads(keep=None):
+    """Delete this session's spooled uploads and their memoized results, except the one still in use"""
+    uploads = st.session_state.setdefault("uploads", {})
+    kept_hash = uploads[keep].sha256 if keep in uploads else None
+    for upload_id in [upload_id for upload_id in uploads if upload_id != keep]:
+        ingested = uploads.pop(upload_id)
+        # Results are keyed by content hash, so they go with the document unless it is still open
+        if ingested.sha256 != kept_hash:
+            st.session_state.get("documents", {}).pop(ingested.sha256, None)
+            st.session_state.get("page_results", {}).pop(ingested.sha256, None)
+        try:
+            ingested.remove()
+        except Exception as e:
+            st.warning(f"Could not remove temporary PDF file: {str(e)}")
+
+def ingest_upload(uploaded_pdf):
+    """Spool an upload to the data directory once per session and reuse it on reruns"""
+    upload_id = getattr(uploaded_pdf, "file_id", None) or f"{uploaded_pdf.name}:{uploaded_pdf.size}"
+    release_uploads(keep=upload_id)
+    uploads = st.session_state["uploads"]
+    ingested = uploads.get(upload_id)
+    if ingested is not None:
+        try:
+            # Cleanup from any session deletes by age, so mark the file as still in use
+            ingested.touch()
+            return ingested
+        except FileNotFoundError:
+            pass
+    # First run, or the hourly cleanup removed the file before this rerun
+    ingested = spool_upload(uploaded_pdf, str(DATA_DIR))
+    uploads[upload_id] = ingested
+    return ingested
 
 def cleanup_old_files():
-    """Clean up files older than 1 hour"""
+    """Clean up files older than 1 hour and prune the persisted doc index"""
     current_time = time.time()
     for file in DATA_DIR.glob("*"):
-        if file.name == ".gitkeep":
+        # Skip .gitkeep and directories such as the persisted doc index
+        if file.name == ".gitkeep" or not file.is_file():
             continue
         if current_time - file.stat().st_mtime > 3600:  # 1 hour
             try:
                 file.unlink()
             except Exception as e:
                 st.warning(f"Could not remove old file {file}: {str(e)}")
+    # The persisted doc index lives in a subdirectory and has its own age and size limits
+    try:
+        doc_index.prune()
+    except Exception as e:
+        st.warning(f"Could not prune the document index: {str(e)}")
+
+def play_progressive_summary(audio_processor, video_processor, summary, page_num):
+    """Synthesize a summary sentence by sentence, making each segment playable as soon as it is ready"""
+    audio_prefix = get_temp_file_path(f"summary_page_{page_num}", "")
+    segments = []
+    preview_slot = st.empty()
+    preview = preview_slot.container()
+    
+    try:
+        with st.spinner("Generating audio..."):
+            for segment in audio_processor.synthesize_segments(summary, audio_prefix):
+                segments.append(segment)
+                preview.audio(segment["path"], format="audio/mp3")
+        
+        if not segments:
+            st.error("Failed to generate audio")
+            return []
+        
+        # Replace the per-sentence previews with the synchronized player
+        with st.spinner("Creating video player..."):
+            preview_slot.empty()
+            if video_processor.create_playlist_player(segments):
+                st.success("Processing complete!")
+            else:
+                st.error("Failed to create video player")
+        return segments
+    except Exception as e:
+        st.error(f"Error processing audio/video: {str(e)}")
+        for segment in segments:
+            if os.path.exists(segment["path"]):
+                os.unlink(segment["path"])
+        return []
+
+def synthesize_summary(audio_processor, summary, page_num, progressive, report=None):
+    """Synthesize a page summary without rendering anything, as segments or as a single file.
+    
+    Errors go to `report` when given, otherwise they are shown where the call happens.
+    """
+    if progressive:
+        audio_prefix = get_temp_file_path(f"summary_page_{page_num}", "")
+        return {"segments": list(audio_processor.synthesize_segments(summary, audio_prefix, report))}
+    audio_path = get_temp_file_path(f"summary_page_{page_num}", ".mp3")
+    return {"audio_path": audio_path if audio_processor.save_audio(summary, audio_path, report) else None}
+
+def has_audio(page):
+    """Check that a page's memoized audio still exists (old files are cleaned up hourly)"""
+    if page.get("segments"):
+        return all(os.path.exists(segment["path"]) for segment in page["segments"])
+    if page.get("audio_path"):
+        return os.path.exists(page["audio_path"])
+    return False
+
+def render_player(video_processor, page):
+    """Render the player for a page whose audio has already been synthesized"""
+    if page.get("segments"):
+        return video_processor.create_playlist_player(page["segments"])
+    return video_processor.create_video_player(page["audio_path"], page["summary"])
+
+def build_pipeline(pdf_extractor, text_summarizer, audio_processor, pdf_source, boilerplate,
+                   summary_params, synthesize_audio, progressive):
+    """Connect extraction, summarization and (optionally) audio synthesis into a pipeline.
+    
+    Stages skip work already memoized on the page, so cached pages pass straight through.
+    They run on worker threads and never write to the page themselves: errors are raised,
+    and warnings are queued under the page's "notices" for the consumer to show.
+    """
+    def extract(page, pdf):
+        if "text" not in page:
+            # Drop repeated headers/footers before they reach spaCy
+            page["text"], page["removed_chars"] = pdf_extractor.extract_clean_page_text(
+                pdf, page["page_num"], boilerplate
+            )
+        return page
+
+    def summarize(page):
+        # Re-scoring with new settings reuses the indexed Doc, so it does not run spaCy again
+        if page.get("summary_params") != summary_params:
+            summary = text_summarizer.summarize_text(page["text"], **summary_params) if page["text"] else ""
+            if summary != page.get("summary"):
+                # Audio made for the previous summary no longer matches
+                page.pop("segments", None)
+                page.pop("audio_path", None)
+            page["summary"] = summary
+            page["summary_params"] = summary_params
+        return page
+
+    def synthesize(page):
+        if page["summary"] and not has_audio(page):
+            notices = page.setdefault("notices", [])
+            page.update(synthesize_summary(audio_processor, page["summary"], page["page_num"], progressive,
+                                           report=notices.append))
+        return page
+
+    stages = [
+        # Each extract worker opens the PDF once and reuses the handle for all its pages
+        Stage("extract", extract, PIPELINE_WORKERS["extract"],
+              worker_context=lambda: pdf_extractor.open_pdf(pdf_source)),
+        Stage("summarize", summarize, PIPELINE_WORKERS["summarize"]),
+    ]
+    if synthesize_audio:
+        stages.append(Stage("audio", synthesize, PIPELINE_WORKERS["audio"]))
+    return PipelineExecutor(stages, queue_size=PIPELINE_QUEUE_SIZE)
 
 def main():
     # Clean up old files
     cleanup_old_files()
     
-    # Load spaCy model at startup
+    # Load and warm up the shared models once per process (no-op on later reruns)
     try:
-        nlp = load_spacy_model()
+        with st.spinner("Loading language models..."):
+            registry.warm_up(["spacy"])
     except Exception as e:
         st.error(f"Error loading language model: {str(e)}")
         return
+    try:
+        registry.warm_up(["tts"])
+    except Exception as e:
+        st.warning(f"Could not warm up the speech engine: {str(e)}")
 
     st.title("PDF Processor with AI")
     st.write("""
@@ -75,66 +218,144 @@ def main():
     audio_processor = AudioProcessor()
     video_processor = VideoProcessor("https://www.youtube.com/watch?v=u7kdVe8q5zs")
     
+    # Progressive mode plays each sentence as soon as it has been synthesized
+    progressive_audio = st.sidebar.checkbox(
+        "Progressive audio", value=True,
+        help="Synthesize the summary sentence by sentence so playback can start right away"
+    )
+    
+    # Summary settings; changing them re-scores stored annotations instead of re-parsing
+    st.sidebar.subheader("Summary")
+    summary_params = {
+        "top_k": st.sidebar.slider("Sentences per summary", 1, 10, TOP_K),
+        "entity_weight": st.sidebar.slider("Named entity weight", 0.0, 5.0, ENTITY_WEIGHT, 0.5),
+        "word_weight": st.sidebar.slider("Important word weight", 0.0, 2.0, WORD_WEIGHT, 0.1),
+        "length_bonus": st.sidebar.slider("Sentence length bonus", 0.0, 5.0, LENGTH_BONUS, 0.5),
+    }
+    
     # File uploader
     uploaded_pdf = st.file_uploader("Choose a PDF file", type="pdf")
     
-    if uploaded_pdf is not None:
-        # Save uploaded PDF to data directory
-        pdf_path = get_temp_file_path("uploaded", ".pdf")
-        with open(pdf_path, "wb") as f:
-            f.write(uploaded_pdf.getvalue())
+    if uploaded_pdf is None:
+        release_uploads()
+        return
+    
+    # Spool the upload to disk in chunks; the content hash identifies the document
+    pdf_source = ingest_upload(uploaded_pdf)
+    
+    # Results are memoized per document so reruns only do work for newly viewed pages
+    doc_key = pdf_source.sha256
+    documents = st.session_state.setdefault("documents", {})
+    page_cache = st.session_state.setdefault("page_results", {}).setdefault(doc_key, {})
+    
+    if doc_key not in documents:
+        documents[doc_key] = {
+            "page_count": pdf_extractor.count_pages(pdf_source),
+            "boilerplate": pdf_extractor.find_boilerplate(pdf_source),
+        }
+    document = documents[doc_key]
+    page_count = document["page_count"]
+    
+    # Paginated view: only the selected range of pages is processed and rendered
+    view_count = max((page_count + PAGES_PER_VIEW - 1) // PAGES_PER_VIEW, 1)
+    view = st.selectbox(
+        "Show pages", range(view_count), key=f"view_{doc_key}",
+        format_func=lambda v: f"{v * PAGES_PER_VIEW + 1}-{min((v + 1) * PAGES_PER_VIEW, page_count)} of {page_count}"
+    )
+    first_page = view * PAGES_PER_VIEW + 1
+    last_page = min(first_page + PAGES_PER_VIEW - 1, page_count)
+    
+    synthesize_view = st.button(
+        f"Generate audio for pages {first_page}-{last_page}", key=f"audio_view_{doc_key}_{view}"
+    )
+    
+    # Extract and summarize pages of this view that are not memoized yet
+    # (and synthesize them all when requested)
+    executor = build_pipeline(
+        pdf_extractor, text_summarizer, audio_processor, pdf_source, document["boilerplate"],
+        summary_params, synthesize_audio=synthesize_view, progressive=progressive_audio
+    )
+    
+    boilerplate_info = st.empty()
+    removed_total = 0
+    
+    # Pages arrive in order while later pages are still being extracted and summarized
+    pages = (dict(page_cache.get(page_num, {"page_num": page_num}))
+             for page_num in range(first_page, last_page + 1))
+    for result in executor.run(pages):
+        page = result.value
+        page_num = page["page_num"]
+        # Messages from the worker threads are shown once, inside this page's expander
+        notices = page.pop("notices", [])
+        if result.error is None:
+            page_cache[page_num] = page
         
-        try:
-            # Process PDF
-            page_texts = pdf_extractor.extract_text_from_pdf(pdf_path)
-            
-            # Process each page
-            for page_num, text in page_texts.items():
-                with st.expander(f"Page {page_num}"):
-                    try:
-                        # Show original text
-                        st.write("**Original Text:**")
-                        st.text(text[:500] + "..." if len(text) > 500 else text)
-                        
-                        # Generate summary
-                        summary = text_summarizer.extract_key_information(text)
-                        if not summary:
-                            st.warning("No summary could be generated for this page")
-                            continue
-                        
-                        st.write("**Summary:**")
-                        st.write(summary)
-                        
-                        # Create files with unique names in data directory
-                        audio_path = get_temp_file_path(f"summary_page_{page_num}", ".mp3")
-                        
-                        try:
-                            # Generate audio
-                            with st.spinner("Generating audio..."):
-                                if audio_processor.save_audio(summary, audio_path):
-                                    with st.spinner("Creating video player..."):
-                                        if video_processor.create_video_player(audio_path, summary):
-                                            st.success("Processing complete!")
-                                        else:
-                                            st.error("Failed to create video player")
-                                else:
-                                    st.error("Failed to generate audio")
-                        except Exception as e:
-                            st.error(f"Error processing audio/video: {str(e)}")
-                            if os.path.exists(audio_path):
-                                os.unlink(audio_path)
-                    
-                    except Exception as e:
-                        st.error(f"Error processing page {page_num}: {str(e)}")
-                        continue
+        removed_total += page.get("removed_chars", 0)
+        if removed_total:
+            boilerplate_info.caption(
+                f"Removed {removed_total} characters of repeated headers/footers before analysis"
+            )
+        
+        # Skip pages without text, as before
+        if result.error is None and not page["text"]:
+            continue
         
-        finally:
-            # Clean up the uploaded PDF
+        with st.expander(f"Page {page_num}"):
+            for notice in notices:
+                st.warning(notice)
+            if result.error is not None:
+                st.error(f"Error processing page {page_num}: {str(result.error)}")
+                continue
+            
             try:
-                if os.path.exists(pdf_path):
-                    os.unlink(pdf_path)
+                # Show original text
+                text = page["text"]
+                st.write("**Original Text:**")
+                st.text(text[:500] + "..." if len(text) > 500 else text)
+                
+                summary = page["summary"]
+                if not summary:
+                    st.warning("No summary could be generated for this page")
+                    continue
+                
+                st.write("**Summary:**")
+                st.write(summary)
+                
+                # Players are only created for pages whose audio was requested
+                if has_audio(page):
+                    if not render_player(video_processor, page):
+                        st.error("Failed to create video player")
+                    continue
+                
+                if not st.button("Generate audio", key=f"audio_{doc_key}_{page_num}"):
+                    continue
+                
+                if progressive_audio:
+                    page["segments"] = play_progressive_summary(
+                        audio_processor, video_processor, summary, page_num
+                    )
+                    continue
+                
+                with st.spinner("Generating audio..."):
+                    page.update(synthesize_summary(audio_processor, summary, page_num, False))
+                if not page["audio_path"]:
+                    st.error("Failed to generate audio")
+                    continue
+                
+                try:
+                    with st.spinner("Creating video player..."):
+                        if video_processor.create_video_player(page["audio_path"], summary):
+                            st.success("Processing complete!")
+                        else:
+                            st.error("Failed to create video player")
+                except Exception as e:
+                    st.error(f"Error processing audio/video: {str(e)}")
+                    if os.path.exists(page["audio_path"]):
+                        os.unlink(page["audio_path"])
+            
             except Exception as e:
-                st.warning(f"Could not remove temporary PDF file: {str(e)}")
+                st.error(f"Error processing page {page_num}: {str(e)}")
+                continue
 
 if __name__ == "__main__":
-    main() 
+    main()
\ No newline at end of file
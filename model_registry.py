@@ -0,0 +1,128 @@
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import pyttsx3
+import spacy
+
+SPACY_MODEL = "en_core_web_sm"
+
+# Speech rate in words per minute
+SPEECH_RATE = 150
+
+# Short document run through every model at boot so the first real request is not the slow one
+WARMUP_TEXT = "Apple opened a new office in Paris last year. The summary starts here."
+
+
+def load_spacy_model():
+    """Load the spaCy model, downloading it first if it is missing"""
+    try:
+        return spacy.load(SPACY_MODEL)
+    except OSError:
+        from spacy.cli import download
+        download(SPACY_MODEL)
+        return spacy.load(SPACY_MODEL)
+
+
+def create_tts_engine(driver_name: Optional[str] = None):
+    """Initialize the text-to-speech engine (platform driver by default) and pick a voice"""
+    engine = pyttsx3.init(driver_name)
+    engine.setProperty('rate', SPEECH_RATE)    # Speed of speech
+    engine.setProperty('volume', 0.9)          # Volume (0.0 to 1.0)
+
+    # Get available voices and set a good quality one
+    voices = engine.getProperty('voices')
+    if voices:
+        # Try to find a female voice
+        female_voice = next((voice for voice in voices if "female" in voice.name.lower()), None)
+        engine.setProperty('voice', female_voice.id if female_voice else voices[0].id)
+    return engine
+
+
+def warm_up_spacy(nlp):
+    """Run the pipeline once so lazily allocated buffers exist before the first request"""
+    list(nlp(WARMUP_TEXT).sents)
+
+
+def warm_up_tts(engine):
+    """Synthesize a short phrase so the speech driver is fully started"""
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        engine.save_to_file(WARMUP_TEXT, path)
+        engine.runAndWait()
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class ModelRegistry:
+    """Process-wide store that loads each model or engine once and shares it between sessions.
+
+    Loading is guarded per model, so concurrent first requests wait for a single
+    load instead of loading twice. Models that are not safe to call from several
+    threads at once (the TTS engine) come with a usage lock from ``lock()``.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._warmers: Dict[str, Optional[Callable[[Any], None]]] = {}
+        self._models: Dict[str, Any] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._use_locks: Dict[str, threading.RLock] = {}
+        self._warmed: set = set()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any],
+                 warm_up: Optional[Callable[[Any], None]] = None):
+        """Register how to load (and optionally warm up) a model"""
+        with self._lock:
+            self._loaders[name] = loader
+            self._warmers[name] = warm_up
+            self._load_locks.setdefault(name, threading.Lock())
+            self._use_locks.setdefault(name, threading.RLock())
+
+    def get(self, name: str) -> Any:
+        """Return the shared instance of a model, loading it on first use"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+        with self._load_locks[name]:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                self._models[name] = self._loaders[name]()
+            return self._models[name]
+
+    def lock(self, name: str) -> threading.RLock:
+        """Lock to hold while using a model that is not thread-safe"""
+        if name not in self._use_locks:
+            raise KeyError(f"No model registered under '{name}'")
+        return self._use_locks[name]
+
+    def is_loaded(self, name: str) -> bool:
+        """Whether a model has already been loaded in this process"""
+        return name in self._models
+
+    def warm_up(self, names: Optional[Iterable[str]] = None):
+        """Load the given (default: all) models and run each one once on a dummy input"""
+        for name in (names if names is not None else list(self._loaders)):
+            model = self.get(name)
+            if name in self._warmed:
+                continue
+            with self._use_locks[name]:
+                if name in self._warmed:
+                    continue
+                try:
+                    if self._warmers[name]:
+                        self._warmers[name](model)
+                finally:
+                    # Warm-up is best effort and attempted only once per process
+                    self._warmed.add(name)
+
+
+registry = ModelRegistry()
+registry.register("spacy", load_spacy_model, warm_up=warm_up_spacy)
+registry.register("tts", create_tts_engine, warm_up=warm_up_tts)
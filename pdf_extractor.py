@@ -1,15 +1,120 @@
 import pdfplumber
-from typing import Dict
+import hashlib
+import math
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Set, Tuple, Union
+from ingestion import IngestedUpload
+
+# A PDF given either as a file path or as a spooled upload read through a memory map
+PDFSource = Union[str, IngestedUpload]
+
+# Share of the page height at the top and bottom searched for running headers/footers
+BAND_RATIO = 0.15
+# A band line is boilerplate when it repeats on at least this share of the sampled pages
+REPEAT_RATIO = 0.5
+# Pages sampled (spread across the document) to learn the repeated lines
+SAMPLE_PAGES = 12
 
 class PDFExtractor:
-    def extract_text_from_pdf(self, pdf_path: str) -> Dict[int, str]:
+    @contextmanager
+    def open_pdf(self, pdf_source: PDFSource):
+        """Open a PDF from a path, or from a memory-mapped view of a spooled upload"""
+        if isinstance(pdf_source, IngestedUpload):
+            with pdf_source.open_view() as view, pdfplumber.open(view) as pdf:
+                yield pdf
+        else:
+            with pdfplumber.open(pdf_source) as pdf:
+                yield pdf
+
+    def extract_text_from_pdf(self, pdf_path: PDFSource) -> Dict[int, str]:
         """Extract text from PDF file page by page"""
         page_texts = {}
         
-        with pdfplumber.open(pdf_path) as pdf:
+        with self.open_pdf(pdf_path) as pdf:
             for page_num, page in enumerate(pdf.pages, 1):
                 text = page.extract_text()
                 if text:
                     page_texts[page_num] = text.strip()
         
-        return page_texts 
\ No newline at end of file
+        return page_texts
+
+    def count_pages(self, pdf_path: PDFSource) -> int:
+        """Return the number of pages in the PDF"""
+        with self.open_pdf(pdf_path) as pdf:
+            return len(pdf.pages)
+
+    def extract_page_text(self, pdf, page_num: int) -> str:
+        """Extract text from a single page (1-based) of a PDF opened with open_pdf.
+
+        The handle is meant to be reused for many pages; it is not thread-safe,
+        so parallel callers each need their own.
+        """
+        page = pdf.pages[page_num - 1]
+        try:
+            text = page.extract_text()
+        finally:
+            # Drop the page's cached layout so a long-lived handle does not keep every page in memory
+            page.close()
+        return text.strip() if text else ""
+
+    def _line_key(self, text: str) -> str:
+        """Hash a line so that e.g. "Page 3 of 10" and "Page 4 of 10" collide"""
+        normalized = re.sub(r'\d+', '#', text.lower())
+        normalized = re.sub(r'\s+', ' ', normalized).strip()
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def _split_band_lines(self, page) -> Tuple[List[dict], List[bool]]:
+        """Return the page's text lines and whether each one lies in the header/footer band"""
+        lines = page.extract_text_lines()
+        top_limit = page.height * BAND_RATIO
+        bottom_limit = page.height * (1 - BAND_RATIO)
+        in_band = [line['bottom'] <= top_limit or line['top'] >= bottom_limit for line in lines]
+        return lines, in_band
+
+    def find_boilerplate(self, pdf_path: PDFSource, sample_pages: int = SAMPLE_PAGES) -> Set[str]:
+        """Find header/footer lines repeated across pages, returned as line hashes"""
+        with self.open_pdf(pdf_path) as pdf:
+            page_count = len(pdf.pages)
+            if page_count < 2:
+                return set()
+            # Spread the sample over the whole document
+            step = max(page_count / sample_pages, 1)
+            indices = sorted({int(i * step) for i in range(min(sample_pages, page_count))})
+
+            counts = Counter()
+            for index in indices:
+                lines, in_band = self._split_band_lines(pdf.pages[index])
+                counts.update({self._line_key(line['text']) for line, band in zip(lines, in_band) if band})
+
+        threshold = max(2, math.ceil(len(indices) * REPEAT_RATIO))
+        return {key for key, count in counts.items() if count >= threshold}
+
+    def extract_clean_page_text(self, pdf, page_num: int, boilerplate: Set[str]) -> Tuple[str, int]:
+        """Extract a single page of an open PDF without repeated header/footer lines.
+
+        Returns the text and the number of characters removed.
+        """
+        if not boilerplate:
+            return self.extract_page_text(pdf, page_num), 0
+
+        page = pdf.pages[page_num - 1]
+        try:
+            lines, in_band = self._split_band_lines(page)
+            kept = []
+            removed_chars = 0
+            for line, band in zip(lines, in_band):
+                if band and self._line_key(line['text']) in boilerplate:
+                    removed_chars += len(line['text'])
+                else:
+                    kept.append(line['text'])
+
+            if not removed_chars:
+                # Nothing to strip on this page, keep pdfplumber's own layout
+                text = page.extract_text()
+                return (text.strip() if text else ""), 0
+        finally:
+            page.close()
+
+        return "\n".join(kept).strip(), removed_chars
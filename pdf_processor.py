@@ -1,7 +1,5 @@
 import streamlit as st
 import pdfplumber
-import spacy
-import pyttsx3
 import tempfile
 from pathlib import Path
 from typing import List, Dict
@@ -10,6 +8,8 @@ from moviepy.video.io.VideoFileClip import VideoFileClip
 from moviepy.audio.io.AudioFileClip import AudioFileClip
 from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
 import time
+from model_registry import registry
+from ingestion import spool_upload
 
 # Check if video exists
 VIDEO_PATH = "videoplayback.mp4"
@@ -18,10 +18,11 @@ if not os.path.exists(VIDEO_PATH):
 
 class PDFProcessor:
     def __init__(self):
-        # Load English language model from spaCy
-        self.nlp = spacy.load("en_core_web_sm")
-        # Initialize text-to-speech engine
-        self.tts_engine = pyttsx3.init()
+        # Shared English language model from spaCy
+        self.nlp = registry.get("spacy")
+        # Shared text-to-speech engine
+        self.tts_engine = registry.get("tts")
+        self.tts_lock = registry.lock("tts")
     
     def extract_text_from_pdf(self, pdf_path: str) -> Dict[int, str]:
         """Extract text from PDF file page by page"""
@@ -55,8 +56,9 @@ class PDFProcessor:
     
     def save_audio(self, text: str, output_path: str):
         """Save text as audio file"""
-        self.tts_engine.save_to_file(text, output_path)
-        self.tts_engine.runAndWait()
+        with self.tts_lock:
+            self.tts_engine.save_to_file(text, output_path)
+            self.tts_engine.runAndWait()
 
     def create_video_with_audio(self, audio_path: str, output_path: str):
         """Combine video with TTS audio"""
@@ -189,10 +191,8 @@ def main():
     uploaded_pdf = st.file_uploader("Choose a PDF file", type="pdf")
     
     if uploaded_pdf is not None:
-        # Create temporary file for PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as pdf_tmp:
-            pdf_tmp.write(uploaded_pdf.getvalue())
-            pdf_path = pdf_tmp.name
+        # Spool the PDF to a temporary file in chunks instead of copying it in memory
+        pdf_path = spool_upload(uploaded_pdf, tempfile.gettempdir()).path
         
         try:
             # Extract text page by page
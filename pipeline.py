@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+from contextlib import ExitStack
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+# Marks the end of the item stream on a queue
+_STOP = object()
+
+# How long blocked queue operations wait before re-checking for cancellation
+_POLL_INTERVAL = 0.1
+
+
+class Stage:
+    """A named processing step run by its own pool of worker threads.
+
+    With ``worker_context`` (a factory returning a context manager), every worker
+    enters its own context once and calls ``func(item, resource)`` with it, so
+    resources that are costly to open and not thread-safe are reused per worker.
+    """
+
+    def __init__(self, name: str, func: Callable[..., Any], workers: int = 1,
+                 worker_context: Optional[Callable[[], ContextManager[Any]]] = None):
+        if workers < 1:
+            raise ValueError(f"Stage '{name}' needs at least one worker")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.worker_context = worker_context
+
+
+class PipelineResult(NamedTuple):
+    """Outcome of one input item after it went through every stage"""
+    index: int
+    value: Any
+    error: Optional[Exception]
+    failed_stage: Optional[str]
+
+
+class StageMetrics:
+    """Process-wide busy time and queueing delay per stage or shared resource, summed over every run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, busy: float, waited: float):
+        """Add one processed item: time spent in the stage function and time spent queued before it"""
+        with self._lock:
+            totals = self._totals.setdefault(stage, {"items": 0, "busy": 0.0, "waited": 0.0})
+            totals["items"] += 1
+            totals["busy"] += busy
+            totals["waited"] += waited
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of the totals: items processed, seconds busy and seconds items spent queued"""
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in self._totals.items()}
+
+    def reset(self):
+        """Clear all totals, e.g. between load-test concurrency levels"""
+        with self._lock:
+            self._totals.clear()
+
+
+stage_metrics = StageMetrics()
+
+
+class PipelineCancelled(Exception):
+    """Raised inside worker threads when the consumer stops reading results"""
+
+
+class PipelineExecutor:
+    """Run items through a chain of stages connected by bounded queues.
+
+    Every stage works on a different item at the same time, so total latency
+    approaches the slowest stage instead of the sum of all stages. Queues are
+    bounded and the number of items in flight is capped, so a slow stage (or a
+    slow consumer) holds back the producer instead of buffering the document.
+    Results are yielded in input order even when a stage has several workers.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4,
+                 thread_hook: Optional[Callable[[threading.Thread], Any]] = None):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.queue_size = max(queue_size, 1)
+        # Called on every thread before it starts, e.g. to attach a Streamlit script context
+        self.thread_hook = thread_hook
+
+    def run(self, items: Iterable[Any]) -> Iterator[PipelineResult]:
+        """Feed items through the stages and yield results in input order"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        cancelled = threading.Event()
+        max_in_flight = self.queue_size * len(queues) + sum(stage.workers for stage in self.stages)
+        in_flight = threading.BoundedSemaphore(max_in_flight)
+        feed_errors: List[Exception] = []
+        remaining_workers = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        def put(target: queue.Queue, message: Any):
+            while True:
+                if cancelled.is_set():
+                    raise PipelineCancelled()
+                try:
+                    target.put(message, timeout=_POLL_INTERVAL)
+                    return
+                except queue.Full:
+                    continue
+
+        def get(source: queue.Queue) -> Any:
+            while True:
+                if cancelled.is_set():
+                    raise PipelineCancelled()
+                try:
+                    return source.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+
+        def feed():
+            try:
+                for index, item in enumerate(items):
+                    while not in_flight.acquire(timeout=_POLL_INTERVAL):
+                        if cancelled.is_set():
+                            raise PipelineCancelled()
+                    put(queues[0], (index, item, None, None, time.monotonic()))
+            except PipelineCancelled:
+                return
+            except Exception as e:
+                feed_errors.append(e)
+            try:
+                for _ in range(self.stages[0].workers):
+                    put(queues[0], _STOP)
+            except PipelineCancelled:
+                pass
+
+        def work(position: int):
+            stage = self.stages[position]
+            source, target = queues[position], queues[position + 1]
+            try:
+                with ExitStack() as worker_stack:
+                    resource, context_error = None, None
+                    if stage.worker_context:
+                        try:
+                            resource = worker_stack.enter_context(stage.worker_context())
+                        except Exception as e:
+                            # Every item this worker takes fails with the setup error
+                            context_error = e
+                    while True:
+                        message = get(source)
+                        if message is _STOP:
+                            break
+                        index, value, error, failed_stage, enqueued_at = message
+                        # Items that already failed pass through untouched
+                        if error is None and context_error is not None:
+                            error, failed_stage = context_error, stage.name
+                        elif error is None:
+                            started_at = time.monotonic()
+                            try:
+                                if stage.worker_context:
+                                    value = stage.func(value, resource)
+                                else:
+                                    value = stage.func(value)
+                            except Exception as e:
+                                error, failed_stage = e, stage.name
+                            stage_metrics.record(stage.name, time.monotonic() - started_at, started_at - enqueued_at)
+                        put(target, (index, value, error, failed_stage, time.monotonic()))
+
+                # The last worker of a stage tells the next stage the stream is over
+                with remaining_lock:
+                    remaining_workers[position] -= 1
+                    last_worker = remaining_workers[position] == 0
+                if last_worker:
+                    next_workers = (self.stages[position + 1].workers
+                                    if position + 1 < len(self.stages) else 1)
+                    for _ in range(next_workers):
+                        put(target, _STOP)
+            except PipelineCancelled:
+                return
+
+        threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+        for position, stage in enumerate(self.stages):
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=work, args=(position,), name=f"pipeline-{stage.name}-{worker}", daemon=True
+                ))
+        for thread in threads:
+            if self.thread_hook:
+                self.thread_hook(thread)
+            thread.start()
+
+        # Reorder buffer: results can finish out of order when a stage has several workers
+        pending: Dict[int, PipelineResult] = {}
+        next_index = 0
+        try:
+            while True:
+                message = get(queues[-1])
+                if message is _STOP:
+                    break
+                result = PipelineResult(*message[:4])
+                pending[result.index] = result
+                while next_index in pending:
+                    in_flight.release()
+                    yield pending.pop(next_index)
+                    next_index += 1
+            if feed_errors:
+                raise feed_errors[0]
+        finally:
+            # Also runs when the consumer abandons the generator, releasing every worker
+            cancelled.set()
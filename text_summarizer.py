@@ -1,70 +1,82 @@
-import spacy
 import streamlit as st
 from collections import Counter
+from model_registry import registry
+from doc_index import doc_index
+
+# Default scoring: sentences to keep and the weight of each scoring signal
+TOP_K = 3
+ENTITY_WEIGHT = 2.0
+WORD_WEIGHT = 0.5
+LENGTH_BONUS = 1.0
 
 class TextSummarizer:
-    def __init__(self):
+    def __init__(self, index=None):
         try:
-            # Use st.cache_resource to load model only once
-            self.nlp = self.load_model()
+            # Shared spaCy instance, loaded only once per process
+            self.nlp = registry.get("spacy")
+            # Processed Docs are stored so re-summarizing skips the pipeline
+            self.index = index or doc_index
         except Exception as e:
             st.error(f"Error loading language model: {str(e)}")
             raise
 
-    @st.cache_resource
-    def load_model():
-        """Load spaCy model with caching"""
-        try:
-            return spacy.load("en_core_web_sm")
-        except OSError:
-            st.warning("Downloading language model... This may take a moment.")
-            spacy.cli.download("en_core_web_sm")
-            return spacy.load("en_core_web_sm")
+    def annotate(self, text: str):
+        """Return the processed Doc for text, running spaCy only if it was never processed"""
+        return self.index.get_or_parse(self.nlp, text)
 
-    def extract_key_information(self, text: str) -> str:
-        """Extract important information using basic NLP"""
-        if not text.strip():
-            return "No text to analyze."
+    def summarize_doc(self, doc, top_k: int = TOP_K, entity_weight: float = ENTITY_WEIGHT,
+                      word_weight: float = WORD_WEIGHT, length_bonus: float = LENGTH_BONUS) -> str:
+        """Score and select sentences from an already processed Doc"""
+        # Simple scoring system
+        scores = []
+        for sent in doc.sents:
+            score = 0
+            # Named entities boost score
+            score += len(list(sent.ents)) * entity_weight
             
-        try:
-            # Basic sentence splitting
-            sentences = [s.strip() for s in text.split('.') if s.strip()]
-            if not sentences:
-                return "No complete sentences found."
-
-            # Process with spaCy
-            doc = self.nlp(text)
+            # Count important words
+            words = [token.text.lower() for token in sent 
+                    if not token.is_stop and not token.is_punct]
+            score += len(words) * word_weight
             
-            # Simple scoring system
-            scores = []
-            for sent in doc.sents:
-                score = 0
-                # Named entities boost score
-                score += len(list(sent.ents)) * 2
+            # Bonus for longer meaningful sentences (but not too long)
+            if 5 <= len(words) <= 20:
+                score += length_bonus
                 
-                # Count important words
-                words = [token.text.lower() for token in sent 
-                        if not token.is_stop and not token.is_punct]
-                score += len(words) * 0.5
-                
-                # Bonus for longer meaningful sentences (but not too long)
-                if 5 <= len(words) <= 20:
-                    score += 1
-                    
-                scores.append((score, sent.text.strip()))
+            scores.append((score, sent.text.strip()))
 
-            # Get top 3 sentences
-            top_sentences = sorted(scores, reverse=True)[:3]
+        # Get top k sentences
+        top_sentences = sorted(scores, reverse=True)[:top_k]
+        
+        if not top_sentences:
+            return "Could not identify key information."
             
-            if not top_sentences:
-                return "Could not identify key information."
-                
-            # Reconstruct in original order
-            summary_sentences = [sent for _, sent in top_sentences]
-            summary = " ".join(summary_sentences)
-            
-            return summary if summary else "No important information found."
+        # Reconstruct in original order
+        summary_sentences = [sent for _, sent in top_sentences]
+        summary = " ".join(summary_sentences)
+        
+        return summary if summary else "No important information found."
+
+    def summarize_text(self, text: str, top_k: int = TOP_K, entity_weight: float = ENTITY_WEIGHT,
+                       word_weight: float = WORD_WEIGHT, length_bonus: float = LENGTH_BONUS) -> str:
+        """Extract important information, raising processing errors instead of showing them"""
+        if not text.strip():
+            return "No text to analyze."
             
+        # Basic sentence splitting
+        sentences = [s.strip() for s in text.split('.') if s.strip()]
+        if not sentences:
+            return "No complete sentences found."
+
+        # Process with spaCy (or reuse the stored annotations)
+        doc = self.annotate(text)
+        return self.summarize_doc(doc, top_k, entity_weight, word_weight, length_bonus)
+
+    def extract_key_information(self, text: str, top_k: int = TOP_K, entity_weight: float = ENTITY_WEIGHT,
+                                word_weight: float = WORD_WEIGHT, length_bonus: float = LENGTH_BONUS) -> str:
+        """Extract important information using basic NLP"""
+        try:
+            return self.summarize_text(text, top_k, entity_weight, word_weight, length_bonus)
         except Exception as e:
             st.error(f"Error in text processing: {str(e)}")
             return "Error processing text." 
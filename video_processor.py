@@ -3,6 +3,8 @@ import os
 from pytube import YouTube
 import streamlit.components.v1 as components
 import re
+import json
+from typing import List, Dict
 
 class VideoProcessor:
     def __init__(self, video_url: str):
@@ -164,6 +166,167 @@ class VideoProcessor:
             st.error(f"Error creating video player: {str(e)}")
             return False
 
+    def _build_subtitle_cues(self, segments: List[Dict]) -> List[Dict]:
+        """Build subtitle cues timed from the real duration of each audio segment"""
+        cues = []
+        offset = 0.0
+        for segment in segments:
+            chunks = self._chunk_text(segment["text"]) or [segment["text"]]
+            # Spread the segment's chunks proportionally to their word counts
+            total_words = sum(len(chunk.split()) for chunk in chunks) or 1
+            start = offset
+            for chunk in chunks:
+                length = segment["duration"] * len(chunk.split()) / total_words
+                cues.append({"start": round(start, 3), "end": round(start + length, 3), "text": chunk})
+                start += length
+            offset += segment["duration"]
+        return cues
+
+    def create_playlist_player(self, segments: List[Dict]):
+        """Create a video player that plays sentence audio segments in order with exact subtitle cues"""
+        try:
+            if not segments:
+                st.warning("No audio segments to play")
+                return False
+
+            playlist = []
+            offset = 0.0
+            for segment in segments:
+                playlist.append({
+                    "src": f"data:audio/mp3;base64,{self._get_audio_base64(segment['path'])}",
+                    "offset": round(offset, 3),
+                })
+                offset += segment["duration"]
+            cues = self._build_subtitle_cues(segments)
+
+            html_content = f"""
+            <div style="position: relative;">
+                <div style="position: relative; padding-bottom: 56.25%;">
+                    <iframe
+                        style="position: absolute; top: 0; left: 0; width: 100%; height: 100%;"
+                        src="https://www.youtube.com/embed/{self.yt.video_id}?enablejsapi=1"
+                        frameborder="0"
+                        allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture"
+                        allowfullscreen
+                        id="youtube_player"
+                    ></iframe>
+                    <div id="subtitle_container" style="position: absolute; bottom: 50px; left: 0; right: 0; text-align: center; z-index: 1000;">
+                        <div id="subtitles" style="
+                            background: rgba(0, 0, 0, 0.7);
+                            color: white;
+                            padding: 10px;
+                            margin: 0 auto;
+                            max-width: 80%;
+                            font-size: 24px;
+                            border-radius: 5px;
+                            display: none;
+                            transition: opacity 0.3s;
+                        "></div>
+                    </div>
+                </div>
+                <audio id="tts_audio" preload="auto"></audio>
+            </div>
+            <script>
+                var tag = document.createElement('script');
+                tag.src = "https://www.youtube.com/iframe_api";
+                var firstScriptTag = document.getElementsByTagName('script')[0];
+                firstScriptTag.parentNode.insertBefore(tag, firstScriptTag);
+
+                var player;
+                var audio = document.getElementById('tts_audio');
+                var subtitles = document.getElementById('subtitles');
+
+                const playlist = {json.dumps(playlist)};
+                const cues = {json.dumps(cues)};
+                let currentSegment = 0;
+                let playlistEnded = false;
+
+                function onYouTubeIframeAPIReady() {{
+                    player = new YT.Player('youtube_player', {{
+                        events: {{
+                            'onStateChange': onPlayerStateChange,
+                            'onReady': onPlayerReady
+                        }}
+                    }});
+                }}
+
+                function loadSegment(index) {{
+                    currentSegment = index;
+                    audio.src = playlist[index].src;
+                    audio.load();
+                }}
+
+                function onPlayerReady(event) {{
+                    loadSegment(0);
+                }}
+
+                function showSubtitles(show) {{
+                    subtitles.style.display = show ? 'block' : 'none';
+                }}
+
+                function updateSubtitles() {{
+                    // Position in the whole summary = segment offset + position in the segment
+                    const position = playlist[currentSegment].offset + audio.currentTime;
+                    const cue = cues.find(c => position >= c.start && position < c.end);
+                    if (cue && subtitles.textContent !== cue.text) {{
+                        subtitles.textContent = cue.text;
+                    }}
+                }}
+
+                function playCurrent() {{
+                    if (playlistEnded) {{
+                        return;
+                    }}
+                    showSubtitles(true);
+                    audio.play().catch(function(error) {{
+                        console.log("Audio play failed:", error);
+                    }});
+                }}
+
+                function resetPlaylist() {{
+                    audio.pause();
+                    showSubtitles(false);
+                    playlistEnded = false;
+                    loadSegment(0);
+                }}
+
+                audio.addEventListener('timeupdate', updateSubtitles);
+
+                audio.addEventListener('ended', function() {{
+                    if (currentSegment + 1 < playlist.length) {{
+                        loadSegment(currentSegment + 1);
+                        if (player && player.getPlayerState() === YT.PlayerState.PLAYING) {{
+                            playCurrent();
+                        }}
+                    }} else {{
+                        playlistEnded = true;
+                        showSubtitles(false);
+                    }}
+                }});
+
+                function onPlayerStateChange(event) {{
+                    if (event.data == YT.PlayerState.PLAYING) {{
+                        playCurrent();
+                    }} else if (event.data == YT.PlayerState.PAUSED) {{
+                        audio.pause();
+                    }} else if (event.data == YT.PlayerState.ENDED) {{
+                        resetPlaylist();
+                    }}
+                }}
+
+                audio.addEventListener('error', function(e) {{
+                    console.error('Error loading audio:', e);
+                }});
+            </script>
+            """
+
+            components.html(html_content, height=450)
+            return True
+
+        except Exception as e:
+            st.error(f"Error creating video player: {str(e)}")
+            return False
+
     def _get_audio_base64(self, audio_path: str) -> str:
         """Convert audio file to base64 string"""
         import base64